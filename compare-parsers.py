@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+
+'''
+Differential tests of template parser implementations against templater.
+
+Random templates and data are rendered by templater, the reference, and by
+every other parser file given, which have to render identical output. The
+time each parser takes is reported relative to templater:
+
+    $ compare-parsers.py [<parser-file> ...] [--count N] [--seed N] [--items N]
+
+Without parser files, parser-10.py is compared. Parser files are loaded as
+modules; those with get_template_parser are set up with it, others the way
+the command line of parser-10.py sets up its parser. Parser files failing
+to load, as those running a script when loaded, or without the classes to
+set up a parser, are reported as skipped.
+
+The random templates only use what every parser supports: text, variables
+with dotted paths and nested EACH blocks. Inside a block, only the data and
+the item of that block are referenced, as older parsers do not pass the
+items of outer blocks down. Raising --items, the most items of a list,
+makes for longer renders and a fairer comparison of speed.
+'''
+
+
+import argparse
+import os
+import random
+import sys
+import time
+import types
+from functools import reduce
+from importlib.machinery import SourceFileLoader
+
+
+class ParserEngine:
+
+    '''
+    A template parser implementation loaded from its file. Files which can
+    not be compared keep the reason in skipped.
+    '''
+
+    parser_names = [
+        'TemplateParser', 'KeywordFinder', 'KeywordParserEach',
+        'KeywordParserEndeach', 'KeywordParserVariable'
+    ]
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.module = None
+        self.skipped = None
+        self.seconds = 0.0
+
+        try:
+            self.module = load_parser_module(path)
+        except (Exception, SystemExit) as error:
+            self.skipped = 'fails to load, {}: {}'.format(
+                type(error).__name__, error
+            )
+            return
+
+        if not hasattr(self.module, 'get_template_parser'):
+            missing = [
+                name for name in self.parser_names
+                if not hasattr(self.module, name)
+            ]
+            if missing:
+                self.skipped = 'has no {}'.format(', '.join(missing))
+
+    def get_parser(self, variables):
+        module = self.module
+        if hasattr(module, 'get_template_parser'):
+            return module.get_template_parser(variables)
+
+        parser = module.TemplateParser()
+        parser.set_keyword_finder(module.KeywordFinder())
+        parser.add_keyword_parser('each', module.KeywordParserEach)
+        parser.add_keyword_parser('endeach', module.KeywordParserEndeach)
+        parser.add_keyword_parser('default', module.KeywordParserVariable)
+        parser.set_variables(variables)
+        return parser
+
+    def render(self, template, variables):
+        '''
+        Render the template, adding the time taken to seconds. Setting up
+        the parser is not timed.
+        '''
+        parser = self.get_parser(variables)
+        start = time.perf_counter()
+        output = parser.parse(template)
+        self.seconds = self.seconds + time.perf_counter() - start
+        return output
+
+
+def load_parser_module(path):
+    '''
+    Load the file as a module, without running its command line. Parsers
+    written for Python 2.7 use the reduce builtin, given to them here.
+    '''
+    name = os.path.basename(path).split('.')[0].replace('-', '_')
+    loader = SourceFileLoader(name, path)
+    module = types.ModuleType(name)
+    module.__file__ = path
+    module.reduce = reduce
+    loader.exec_module(module)
+    return module
+
+
+# Random templates and data
+
+class RandomCase:
+
+    '''
+    Generates a random data schema, data following it, and a template only
+    referencing paths the data has.
+
+    Schemas are 'text', dicts of schemas by key, or lists of one schema for
+    every item. Keys are never keywords, or loop, and item names are never
+    keys, so no parser gives them another meaning.
+    '''
+
+    keys = ['title', 'name', 'items', 'price', 'tags', 'user', 'city', 'rows']
+    characters = 'abcxyz ABC 019 .,:;!?-_/\\\'"<>{}()\n\téö中'
+    keywords = ['EACH', 'each', 'Each', 'eAcH']
+
+    def __init__(self, seed, items = 4):
+        self.random = random.Random(seed)
+        self.list_items = items
+        self.items = 0
+
+    def generate(self):
+        schema = self.get_dict_schema(3)
+        data = self.get_data(schema)
+        template = self.get_template(schema, schema, 3)
+        return template, data
+
+    def get_schema(self, depth):
+        choice = self.random.random()
+        if depth <= 0 or choice < 0.4:
+            return 'text'
+        if choice < 0.7:
+            return self.get_dict_schema(depth - 1)
+        return [self.get_schema(depth - 1)]
+
+    def get_dict_schema(self, depth):
+        count = self.random.randint(1, 4)
+        keys = self.random.sample(self.keys, count)
+        return dict((key, self.get_schema(depth)) for key in keys)
+
+    def get_data(self, schema):
+        if schema == 'text':
+            return self.get_text(0, 12)
+        if isinstance(schema, list):
+            count = self.random.randint(0, self.list_items)
+            return [self.get_data(schema[0]) for _ in range(count)]
+        return dict((key, self.get_data(schema[key])) for key in schema)
+
+    def get_text(self, shortest, longest):
+        length = self.random.randint(shortest, longest)
+        return ''.join(
+            self.random.choice(self.characters) for _ in range(length)
+        )
+
+    def get_paths(self, scope):
+        '''
+        Dotted paths to text and to lists in the scope, without going
+        through lists.
+        '''
+        texts = []
+        lists = []
+        pending = [((key,), scope[key]) for key in sorted(scope)]
+        while pending:
+            path, schema = pending.pop()
+            if schema == 'text':
+                texts.append('.'.join(path))
+            elif isinstance(schema, list):
+                lists.append(('.'.join(path), schema[0]))
+            else:
+                for key in sorted(schema):
+                    pending.append((path + (key,), schema[key]))
+        return texts, lists
+
+    def get_template(self, data, scope, depth):
+        ''' Template parts referencing the scope, with EACH blocks in depth '''
+        texts, lists = self.get_paths(scope)
+        parts = []
+
+        for _ in range(self.random.randint(0, 5)):
+            choice = self.random.random()
+            if choice < 0.3:
+                parts.append(self.get_text(1, 8).replace('*', ''))
+            elif choice < 0.7 and texts:
+                parts.append(self.get_tag(self.random.choice(texts)))
+            elif choice < 0.75:
+                parts.append(self.get_tag(''))
+            elif depth > 0 and lists:
+                path, item = self.random.choice(lists)
+                name = 'item{}'.format(self.items)
+                self.items = self.items + 1
+                block_scope = dict(data)
+                block_scope[name] = item
+                keyword = self.random.choice(self.keywords)
+                parts.append(self.get_tag(
+                    '{} {} {}'.format(keyword, path, name)
+                ))
+                parts.append(self.get_template(data, block_scope, depth - 1))
+                parts.append(self.get_tag(keyword[:1] + 'ndeach'))
+
+        return ''.join(parts)
+
+    def get_tag(self, string):
+        before = ' ' * self.random.randint(0, 2)
+        after = ' ' * self.random.randint(0, 2)
+        return '<*{}{}{}*>'.format(before, string, after)
+
+
+# Comparing parsers
+
+def compare_parsers(reference, engines, count, seed, items = 4):
+    '''
+    Render count random cases with the reference and every engine not
+    skipped. Returns the mismatches as (engine, template, data, expected,
+    output) tuples, where output is the exception raised when rendering
+    failed.
+    '''
+    engines = [engine for engine in engines if engine.skipped is None]
+    mismatches = []
+    for number in range(count):
+        template, data = RandomCase(seed + number, items).generate()
+        expected = reference.render(template, data)
+
+        for engine in engines:
+            try:
+                output = engine.render(template, data)
+            except Exception as error:
+                output = error
+            if output != expected:
+                mismatches.append((engine, template, data, expected, output))
+
+    return mismatches
+
+def report(reference, engines, mismatches, count):
+    for engine, template, data, expected, output in mismatches[:5]:
+        print('Mismatch in {}'.format(engine.name))
+        print('    template: {!r}'.format(template))
+        print('    data:     {!r}'.format(data))
+        print('    expected: {!r}'.format(expected))
+        print('    output:   {!r}'.format(output))
+
+    for engine in engines:
+        if engine.skipped is not None:
+            print('{}: skipped, {}'.format(engine.name, engine.skipped))
+            continue
+        failed = len([item for item in mismatches if item[0] is engine])
+        relative = engine.seconds / max(reference.seconds, 1e-9)
+        print('{}: {} of {} cases identical, {:.2f}x the time of {}'.format(
+            engine.name, count - failed, count, relative, reference.name
+        ))
+
+
+# Basic command line interface functions
+
+def get_command_line_arguments():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'parser_files',
+        nargs='*',
+        default=[os.path.join(directory, 'parser-10.py')],
+        help='parser files compared with the reference'
+    )
+    parser.add_argument(
+        '--reference',
+        default=os.path.join(directory, 'templater'),
+        help='parser file rendering the expected output, templater by default'
+    )
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--items', type=int, default=4)
+    return vars(parser.parse_args())
+
+
+if __name__ == '__main__':
+
+    args = get_command_line_arguments()
+
+    reference = ParserEngine(args['reference'])
+    if reference.skipped is not None:
+        sys.exit('{}: {}'.format(reference.name, reference.skipped))
+    engines = [ParserEngine(path) for path in args['parser_files']]
+
+    mismatches = compare_parsers(
+        reference, engines, args['count'], args['seed'], args['items']
+    )
+    report(reference, engines, mismatches, args['count'])
+
+    if mismatches:
+        sys.exit(1)